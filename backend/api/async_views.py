@@ -0,0 +1,91 @@
+"""Асинхронные обёртки для горячих маршрутов чтения при запуске через ASGI.
+
+В Django 3.2 нет асинхронного ORM, поэтому синхронные представления DRF
+выполняются в собственном пуле потоков. Каждый поток держит своё
+соединение с базой (при CONN_MAX_AGE > 0 оно переиспользуется), так что
+пул потоков ограничивает и число соединений. Запросы на запись идут
+в общий поток, как их выполнял бы сам Django.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+from api.db import check_connections
+from api.views import (
+    CustomUserViewSet, IngredientsViewSet, RecipeViewSet, TagsViewSet
+)
+
+HOT_READS = {
+    TagsViewSet: {'list', 'retrieve'},
+    IngredientsViewSet: {'list', 'retrieve'},
+    RecipeViewSet: {'list', 'retrieve'},
+    CustomUserViewSet: {'subscriptions'},
+}
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_DB_POOL_SIZE,
+            thread_name_prefix='async-read'
+        )
+    return _executor
+
+
+def run_read(view, request, *args, **kwargs):
+    close_old_connections()
+    check_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    read = sync_to_async(
+        partial(run_read, view), thread_sensitive=False,
+        executor=get_executor()
+    )
+    write = sync_to_async(view)
+
+    async def async_view(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+
+    async_view.csrf_exempt = True
+    async_view.cls = view.cls
+    async_view.actions = view.actions
+    return async_view
+
+
+def is_hot_read(callback):
+    actions = getattr(callback, 'actions', None) or {}
+    return actions.get('get') in HOT_READS.get(
+        getattr(callback, 'cls', None), ()
+    )
+
+
+def async_read_urls(urlpatterns):
+    """Заменяет представления горячих маршрутов чтения на асинхронные,
+    если включён режим ASYNC_READ_VIEWS."""
+    if not settings.ASYNC_READ_VIEWS:
+        return urlpatterns
+    return [
+        URLPattern(
+            pattern.pattern, async_read_view(pattern.callback),
+            pattern.default_args, pattern.name
+        ) if is_hot_read(pattern.callback) else pattern
+        for pattern in urlpatterns
+    ]
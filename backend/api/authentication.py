@@ -0,0 +1,53 @@
+import copy
+
+from django.conf import settings
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.cache import LRUCache, get_revision, publish_revision
+
+token_cache = LRUCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication, запоминающий пользователя по ключу токена.
+
+    Запись сбрасывается сигналами при удалении токена (logout) и при
+    сохранении пользователя (деактивация, смена пароля). Чтобы сброс
+    увидели остальные воркеры, в общем кэше Django хранится метка отзыва
+    токена: запись в памяти процесса действительна, только пока метка не
+    изменилась (для нескольких воркеров нужен общий CACHE_BACKEND).
+    Представлению отдаётся копия пользователя, чтобы изменения
+    в одном запросе не попадали в кэш.
+    """
+
+    def authenticate_credentials(self, key):
+        revision = get_revision(revocation_key(key))
+        cached = token_cache.get(key)
+        if cached is None or cached[2] != revision:
+            cached = (*super().authenticate_credentials(key), revision)
+            token_cache.set(key, cached)
+        user, token, _ = cached
+        return copy.copy(user), token
+
+
+def revocation_key(key):
+    return f'token-revoked:{key}'
+
+
+def revoke_token(key):
+    token_cache.delete(key)
+    publish_revision(revocation_key(key), settings.TOKEN_CACHE_TTL or None)
+
+
+def invalidate_token(key):
+    revoke_token(key)
+    transaction.on_commit(lambda: revoke_token(key))
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(
+        user_id=user_id
+    ).values_list('key', flat=True):
+        invalidate_token(key)
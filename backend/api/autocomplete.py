@@ -0,0 +1,132 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+
+from recipes.models import Ingredient
+
+
+def trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Сначала возвращаются совпадения по началу названия (бинарный поиск по
+    отсортированным названиям), затем по вхождению подстроки (кандидаты
+    отбираются по триграммам).
+
+    Индекс хранит версию таблицы (число строк и максимальный updated_at),
+    вычисленную по строкам, из которых он построен. Не чаще раза в
+    INGREDIENT_INDEX_CHECK_INTERVAL секунд версия сверяется с базой, и
+    индекс перестраивается, если ингредиенты изменил другой процесс.
+    """
+
+    def __init__(self, ingredients):
+        ingredients = list(ingredients)
+        self.version = (
+            len(ingredients),
+            max((row[3] for row in ingredients), default=None)
+        )
+        self.checked = time.monotonic()
+        self.items = sorted(
+            (
+                {'id': pk, 'name': name, 'measurement_unit': unit}
+                for pk, name, unit, _ in ingredients
+            ),
+            key=lambda item: (item['name'].lower(), item['id'])
+        )
+        self.keys = [item['name'].lower() for item in self.items]
+        self.trigrams = defaultdict(set)
+        for position, key in enumerate(self.keys):
+            for trigram in trigrams(key):
+                self.trigrams[trigram].add(position)
+
+    def prefix_positions(self, query):
+        position = bisect_left(self.keys, query)
+        while (
+            position < len(self.keys)
+            and self.keys[position].startswith(query)
+        ):
+            yield position
+            position += 1
+
+    def substring_positions(self, query):
+        query_trigrams = trigrams(query)
+        if query_trigrams:
+            candidates = set.intersection(*(
+                self.trigrams.get(trigram, set())
+                for trigram in query_trigrams
+            ))
+        else:
+            candidates = range(len(self.keys))
+        for position in sorted(candidates):
+            key = self.keys[position]
+            if query in key and not key.startswith(query):
+                yield position
+
+    def search(self, query, limit):
+        query = query.strip().lower()
+        result = []
+        for positions in (
+            self.prefix_positions(query), self.substring_positions(query)
+        ):
+            for position in positions:
+                if len(result) >= limit:
+                    return result
+                result.append(self.items[position])
+        return result
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def ingredient_version():
+    version = Ingredient.objects.aggregate(
+        last_modified=Max('updated_at'), count=Count('id')
+    )
+    return version['count'], version['last_modified']
+
+
+def is_fresh(index):
+    return index is not None and (
+        time.monotonic() - index.checked
+        < settings.INGREDIENT_INDEX_CHECK_INTERVAL
+    )
+
+
+def get_ingredient_index():
+    global _index
+    index = _index
+    if is_fresh(index):
+        return index
+    with _lock:
+        index = _index
+        if index is not None and not is_fresh(index):
+            if index.version == ingredient_version():
+                index.checked = time.monotonic()
+            else:
+                index = None
+        if index is None:
+            index = _index = IngredientIndex(
+                Ingredient.objects.values_list(
+                    'id', 'name', 'measurement_unit', 'updated_at'
+                )
+            )
+    return index
+
+
+def drop_ingredient_index():
+    global _index
+    _index = None
+
+
+def invalidate_ingredient_index():
+    drop_ingredient_index()
+    transaction.on_commit(drop_ingredient_index)
@@ -0,0 +1,229 @@
+"""Синтетический набор данных и замеры API для команды benchmark_api."""
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.counters import reconcile_counters
+from recipes.models import (
+    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag
+)
+from recipes.shopping_list import rebuild
+from users.models import Follow, User
+
+DEFAULT_SIZES = {
+    'users': 50,
+    'recipes': 500,
+    'ingredients': 1000,
+    'ingredients_per_recipe': 8,
+    'follows': 10,
+    'favorites': 20,
+    'cart': 10,
+}
+
+ROUTES = (
+    ('tags', 'get', '/api/tags/'),
+    ('ingredients', 'get', '/api/ingredients/'),
+    ('ingredients_search', 'get', '/api/ingredients/?name=ингредиент 1'),
+    ('users', 'get', '/api/users/'),
+    ('users_me', 'get', '/api/users/me/'),
+    ('user_detail', 'get', '/api/users/{author}/'),
+    ('subscriptions', 'get', '/api/users/subscriptions/?recipes_limit=3'),
+    ('recipes', 'get', '/api/recipes/'),
+    ('recipes_cursor', 'get', '/api/recipes/?pagination=cursor'),
+    ('recipes_filter', 'get',
+     '/api/recipes/?tags=tag0&tags=tag1&is_favorited=1&author={author}'),
+    ('recipe_detail', 'get', '/api/recipes/{recipe}/'),
+    ('download_shopping_cart', 'get', '/api/recipes/download_shopping_cart/'),
+    ('favorite', ('post', 'delete'), '/api/recipes/{recipe}/favorite/'),
+    ('shopping_cart', ('post', 'delete'),
+     '/api/recipes/{recipe}/shopping_cart/'),
+)
+
+
+def seed(sizes, seed=0):
+    """Заполняет базу синтетическими данными, возвращает пользователя,
+    от имени которого выполняются запросы."""
+    rng = random.Random(seed)
+    User.objects.bulk_create(
+        User(
+            username=f'user{i}', email=f'user{i}@example.com',
+            first_name=f'Имя{i}', last_name=f'Фамилия{i}',
+        )
+        for i in range(sizes['users'])
+    )
+    users = list(User.objects.order_by('id'))
+    Tag.objects.bulk_create(
+        Tag(name=f'Тег {i}', color=f'#0000{i:02d}', slug=f'tag{i}')
+        for i in range(6)
+    )
+    tags = list(Tag.objects.all())
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {i}', measurement_unit='г')
+        for i in range(sizes['ingredients'])
+    )
+    ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+    Recipe.objects.bulk_create(
+        Recipe(
+            name=f'Рецепт {i}', author=rng.choice(users),
+            image='recipes/benchmark.png', text='Описание ' * 20,
+            cooking_time=rng.randint(1, 120),
+        )
+        for i in range(sizes['recipes'])
+    )
+    recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+        for recipe_id in recipe_ids
+        for tag in rng.sample(tags, 2)
+    )
+    IngredientRecipe.objects.bulk_create(
+        IngredientRecipe(
+            recipe_id=recipe_id, ingredient_id=ingredient_id,
+            amount=rng.randint(1, 500),
+        )
+        for recipe_id in recipe_ids
+        for ingredient_id in rng.sample(
+            ingredient_ids, sizes['ingredients_per_recipe']
+        )
+    )
+    for user in users:
+        authors = rng.sample(
+            [author for author in users if author != user],
+            min(sizes['follows'], len(users) - 1)
+        )
+        Follow.objects.bulk_create(
+            Follow(user=user, author=author) for author in authors
+        )
+        for model, size in (
+            (Favorite, sizes['favorites']), (ShoppingCart, sizes['cart'])
+        ):
+            model.objects.bulk_create(
+                model(user=user, recipe_id=recipe_id)
+                for recipe_id in rng.sample(recipe_ids, size)
+            )
+    reconcile_counters()
+    rebuild([user.id for user in users])
+    return users[0]
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def measure(user, iterations):
+    """Первый прогон каждого маршрута прогревочный: в нём замеряется пик
+    выделенной памяти (tracemalloc замедляет код и исказил бы задержку)."""
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    author = Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ).first()
+    recipe = Recipe.objects.exclude(
+        favorites__user=user
+    ).exclude(cart__user=user).values_list('id', flat=True).first()
+    results = {}
+    for name, methods, url in ROUTES:
+        url = url.format(author=author, recipe=recipe)
+        if isinstance(methods, str):
+            steps = ((name, methods),)
+        else:
+            steps = tuple((f'{name}_{method}', method) for method in methods)
+        samples = {step: ([], [0], [0]) for step, _ in steps}
+        for iteration in range(iterations + 1):
+            for step, method in steps:
+                timings, queries, allocated = samples[step]
+                warmup = iteration == 0
+                if warmup:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                with CaptureQueriesContext(connection) as context:
+                    response = getattr(client, method)(url)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                if warmup:
+                    allocated[0] = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                else:
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries[0] = max(queries[0], len(context.captured_queries))
+                if response.status_code >= 400:
+                    raise AssertionError(
+                        f'{step}: {method.upper()} {url} вернул '
+                        f'{response.status_code}'
+                    )
+        for step, (timings, queries, allocated) in samples.items():
+            results[step] = {
+                'queries': queries[0],
+                'p50_ms': round(statistics.median(timings), 2),
+                'p95_ms': round(percentile(timings, 0.95), 2),
+                'peak_kb': round(allocated[0] / 1024, 1),
+            }
+    return results
+
+
+def compare(results, baseline, latency_tolerance):
+    """Список регрессий относительно сохранённой базовой линии."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result['queries'] > expected['queries']:
+            regressions.append(
+                f'{name}: запросов {result["queries"]}, '
+                f'в базовой линии {expected["queries"]}'
+            )
+        limit = expected['p95_ms'] * (1 + latency_tolerance)
+        if result['p95_ms'] > limit:
+            regressions.append(
+                f'{name}: p95 {result["p95_ms"]} мс, допустимо {limit:.2f} мс'
+            )
+    return regressions
+
+
+def measure_connections(path, iterations, conn_max_age, health_checks):
+    """Задержка маршрута через полный WSGI-обработчик и число открытых за
+    прогон соединений к базе: request_started/request_finished закрывают
+    и проверяют соединения так же, как в gunicorn."""
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    opened = []
+
+    def count(**kwargs):
+        opened.append(kwargs['connection'].alias)
+
+    connection.close()
+    previous = connection.settings_dict['CONN_MAX_AGE']
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    connection_created.connect(count)
+    timings = []
+    try:
+        with override_settings(DB_HEALTH_CHECKS=health_checks):
+            for _ in range(iterations):
+                environ = factory.get(path).environ
+                started = time.perf_counter()
+                response = handler(environ, lambda status, headers: None)
+                b''.join(response)
+                response.close()
+                timings.append((time.perf_counter() - started) * 1000)
+    finally:
+        connection_created.disconnect(count)
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = previous
+    return {
+        'connections': len(opened),
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+    }
@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+class LRUCache:
+    """Потокобезопасный LRU-кэш с ограниченным размером и необязательным TTL.
+
+    Кэш живёт в памяти процесса: каждый воркер держит свою копию.
+    """
+
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                value, expires = self.data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires < time.monotonic():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self.lock:
+            self.data[key] = (value, expires)
+            self.data.move_to_end(key)
+            while len(self.data) > self.max_size:
+                self.data.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.data.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.data.clear()
+
+
+def get_revision(name):
+    """Метка ревизии ключа в общем кэше Django."""
+    return cache.get(f'revision:{name}')
+
+
+def publish_revision(name, ttl=None):
+    """Меняет метку ревизии: записи в памяти воркеров, загруженные при
+    прежней метке, перестают быть действительными."""
+    cache.set(f'revision:{name}', uuid4().hex, ttl)
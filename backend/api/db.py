@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.db import connections
+from django.db.models.sql import InsertQuery
+
+
+def check_connections(**kwargs):
+    """Проверяет переиспользуемые соединения в начале запроса.
+
+    В Django 3.2 нет CONN_HEALTH_CHECKS: постоянное соединение, оборванное
+    базой или пулером, обнаружилось бы только ошибкой в запросе. Здесь
+    открытое соединение пингуется и закрывается, если не отвечает, тогда
+    ORM откроет новое при первом обращении.
+    """
+    if not settings.DB_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        if connection.connection is not None and not connection.is_usable():
+            connection.close()
+
+
+def insert_ignore(objs):
+    """Одна вставка INSERT ... ON CONFLICT DO NOTHING (INSERT OR IGNORE
+    в SQLite), возвращает число реально добавленных строк.
+
+    Сигналы post_save не отправляются.
+    """
+    model = type(objs[0])
+    fields = [
+        field for field in model._meta.concrete_fields
+        if not field.primary_key
+    ]
+    query = InsertQuery(model, ignore_conflicts=True)
+    query.insert_values(fields, objs)
+    using = model.objects.db
+    inserted = 0
+    with connections[using].cursor() as cursor:
+        for sql, params in query.get_compiler(using=using).as_sql():
+            cursor.execute(sql, params)
+            inserted += cursor.rowcount
+    return inserted
+
+
+def delete_rows(queryset):
+    """Удаляет строки одним DELETE без сигналов, возвращает их число."""
+    return queryset._raw_delete(queryset.db)
@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import os
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FILENAME = 'ingredients_in_cart'
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+def export_txt(shopping_list):
+    for name, unit, amount in shopping_list:
+        yield f'* {name} ({unit}) - {amount}\n'
+
+
+def export_csv(shopping_list):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'measurement_unit', 'amount'))
+    for row in shopping_list:
+        yield writer.writerow(row)
+
+
+def export_json(shopping_list):
+    yield '['
+    for index, (name, unit, amount) in enumerate(shopping_list):
+        item = json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False
+        )
+        yield f',{item}' if index else item
+    yield ']'
+
+
+def get_pdf_font():
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if not os.path.exists(font_path):
+        return 'Helvetica'
+    font_name = os.path.splitext(os.path.basename(font_path))[0]
+    if font_name not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(font_name, font_path))
+    return font_name
+
+
+def export_pdf(shopping_list):
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    width, height = A4
+    top = height - 60
+    pdf.setFont(font, 16)
+    pdf.drawString(50, top, 'Список покупок')
+    y = top - 30
+    pdf.setFont(font, 12)
+    for name, unit, amount in shopping_list:
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = top
+        pdf.drawString(50, y, f'* {name} ({unit}) - {amount}')
+        y -= 20
+    pdf.save()
+    return buffer.getvalue()
+
+
+STREAMING_EXPORTERS = {
+    'txt': (export_txt, 'text/plain; charset=utf-8'),
+    'csv': (export_csv, 'text/csv; charset=utf-8'),
+    'json': (export_json, 'application/json'),
+}
+EXPORT_FORMATS = (*STREAMING_EXPORTERS, 'pdf')
+
+
+def export_response(shopping_list, file_format):
+    if file_format == 'pdf':
+        response = HttpResponse(
+            export_pdf(shopping_list), content_type='application/pdf'
+        )
+    else:
+        exporter, content_type = STREAMING_EXPORTERS[file_format]
+        response = StreamingHttpResponse(
+            exporter(shopping_list), content_type=content_type
+        )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{FILENAME}.{file_format}"'
+    )
+    return response
@@ -1,5 +1,17 @@
+from django.db.models import Exists, F, OuterRef, Value
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import FilterSet, filters
-from recipes.models import Recipe, Ingredient, Tag
+
+from recipes.models import Favorite, Recipe, Ingredient, ShoppingCart, Tag
+from recipes.search import search_recipes
+
+
+RECIPE_ORDERINGS = {
+    'newest': ('-id',),
+    'popular': ('-favorites_count', '-id'),
+    'trending': ('-trending_score', '-id'),
+    'quick': ('cooking_time', '-id'),
+}
 
 
 class RecipeFilter(FilterSet):
@@ -7,6 +19,7 @@ class RecipeFilter(FilterSet):
         field_name='tags__slug',
         queryset=Tag.objects.all(),
         to_field_name='slug',
+        method='filter_tags',
     )
     is_favorited = filters.BooleanFilter(
         method='filtering', field_name='is_favorited'
@@ -14,16 +27,48 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filtering', field_name='is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method='order_by',
+    )
 
     class Meta:
         model = Recipe
         fields = ('is_favorited', 'is_in_shopping_cart', 'author', 'tags')
 
+    def filter_search(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return search_recipes(queryset, value)
+
+    def order_by(self, queryset, name, value):
+        if value == 'trending':
+            queryset = queryset.annotate(trending_score=Coalesce(
+                F('ranking__trending_score'), Value(0.0)
+            ))
+        return queryset.order_by(*RECIPE_ORDERINGS[value])
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=[tag.id for tag in value]
+        )))
+
     def filtering(self, queryset, name, value):
-        if name == 'is_favorited' and value:
-            return queryset.filter(favorites__user=self.request.user)
-        if name == 'is_in_shopping_cart' and value:
-            return queryset.filter(cart__user=self.request.user)
+        if not value:
+            return queryset
+        model = {
+            'is_favorited': Favorite,
+            'is_in_shopping_cart': ShoppingCart,
+        }[name]
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.filter(Exists(model.objects.filter(
+            user=user, recipe_id=OuterRef('pk')
+        )))
 
 
 class IngredientFilter(FilterSet):
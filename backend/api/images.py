@@ -0,0 +1,113 @@
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.utils import timezone
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+from rest_framework import serializers
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    'thumbnail': (160, 160),
+    'card_image': (480, 480),
+}
+RESAMPLE = getattr(Image, 'Resampling', Image).LANCZOS
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_RENDITION_WORKERS,
+    thread_name_prefix='renditions'
+)
+
+
+class RecipeImageField(Base64ImageField):
+    """Base64ImageField, отклоняющий слишком большие файлы до декодирования."""
+
+    def to_internal_value(self, base64_data):
+        if (
+            isinstance(base64_data, str)
+            and len(base64_data) * 3 // 4 > settings.RECIPE_IMAGE_MAX_SIZE
+        ):
+            raise serializers.ValidationError(
+                'Размер изображения превышает допустимый'
+            )
+        return super().to_internal_value(base64_data)
+
+
+class RenditionImageField(serializers.ReadOnlyField):
+    """URL уменьшенной копии изображения рецепта или оригинала, пока копия
+    не готова."""
+
+    def __init__(self, rendition, **kwargs):
+        self.rendition = rendition
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        image = getattr(recipe, self.rendition) or recipe.image
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return image.url
+        return request.build_absolute_uri(image.url)
+
+
+def render(image, size):
+    image = image.copy()
+    image.thumbnail(size, RESAMPLE)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=80, method=4)
+    return buffer.getvalue()
+
+
+def generate_renditions(recipe_id):
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    with recipe.image.open('rb') as file, Image.open(file) as image:
+        image.load()
+        renditions = {}
+        for field, size in RENDITIONS.items():
+            rendition = getattr(recipe, field)
+            name = f'{recipe.pk}_{field}.webp'
+            rendition.storage.delete(
+                rendition.field.generate_filename(recipe, name)
+            )
+            rendition.save(name, ContentFile(render(image, size)), save=False)
+            renditions[field] = rendition.name
+    Recipe.objects.filter(pk=recipe.pk, image=recipe.image.name).update(
+        updated_at=timezone.now(), **renditions
+    )
+
+
+def run_generate_renditions(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    except Exception:
+        logger.exception('Не удалось подготовить изображения рецепта %s',
+                         recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(recipe):
+    """Готовит уменьшенные копии изображения после коммита транзакции.
+
+    По умолчанию работа выполняется в фоновом пуле потоков, чтобы
+    ресайз и кодирование в WebP не занимали воркер, обслуживающий запрос.
+    """
+    if settings.IMAGE_RENDITIONS_ASYNC:
+        transaction.on_commit(
+            lambda: _executor.submit(run_generate_renditions, recipe.pk)
+        )
+    else:
+        transaction.on_commit(lambda: generate_renditions(recipe.pk))
@@ -0,0 +1,116 @@
+"""Нагрузочное сравнение WSGI и ASGI для команды loadtest_api.
+
+Оба сервера запускаются через gunicorn.conf.py на одной машине и одной
+базе, нагрузку дают потоки с keep-alive соединениями (замкнутый цикл:
+каждый поток отправляет следующий запрос после ответа на предыдущий).
+"""
+import http.client
+import os
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+from django.conf import settings
+
+from api.benchmark import percentile
+
+ROUTES = (
+    '/api/tags/',
+    '/api/ingredients/?name=ингредиент 1',
+    '/api/recipes/',
+    '/api/recipes/{recipe}/',
+    '/api/users/subscriptions/?recipes_limit=3',
+)
+
+
+def start_server(mode, port, workers, env):
+    process = subprocess.Popen(
+        (
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f'127.0.0.1:{port}', '--workers', str(workers),
+        ),
+        cwd=settings.BASE_DIR,
+        env={**os.environ, **env, 'SERVER_MODE': mode},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{mode}: сервер завершился при запуске')
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', '/api/tags/')
+            connection.getresponse().read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f'{mode}: сервер не ответил за 30 секунд')
+
+
+def worker(port, urls, headers, deadline, timings, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port)
+    index = 0
+    while time.monotonic() < deadline:
+        url = urls[index % len(urls)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            connection.request('GET', url, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(url)
+            connection.close()
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            continue
+        timings.append((time.perf_counter() - started) * 1000)
+        if response.status >= 400:
+            errors.append(url)
+
+
+def run_load(port, urls, token, concurrency, duration):
+    headers = {'Authorization': f'Token {token}'}
+    timings, errors = [], []
+    started = time.monotonic()
+    threads = [
+        threading.Thread(
+            target=worker,
+            args=(port, urls, headers, started + duration, timings, errors),
+        )
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    if not timings:
+        return {'rps': 0, 'p50_ms': 0, 'p95_ms': 0, 'p99_ms': 0,
+                'errors': len(errors)}
+    return {
+        'rps': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings, 0.5), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'errors': len(errors),
+    }
+
+
+def compare_modes(urls, token, port, workers, concurrency, duration, env):
+    """Поочерёдно поднимает WSGI- и ASGI-сервер и нагружает каждый."""
+    urls = [quote(url, safe='/?=&') for url in urls]
+    results = {}
+    for mode in ('wsgi', 'asgi'):
+        process = start_server(mode, port, workers, env)
+        try:
+            run_load(port, urls, token, concurrency, min(duration, 2))
+            results[mode] = run_load(
+                port, urls, token, concurrency, duration
+            )
+        finally:
+            process.terminate()
+            process.wait()
+    return results
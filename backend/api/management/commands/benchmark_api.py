@@ -0,0 +1,85 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from api.benchmark import DEFAULT_SIZES, compare, measure, seed
+
+BASELINE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+    'benchmark_baseline.json'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число запросов, задержку и память для маршрутов API '
+        'на синтетических данных во временной тестовой базе'
+    )
+
+    def add_arguments(self, parser):
+        for name, default in DEFAULT_SIZES.items():
+            parser.add_argument(
+                f'--{name.replace("_", "-")}', type=int, default=default
+            )
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument(
+            '--latency-tolerance', type=float, default=1.0,
+            help='Допустимый рост p95 относительно базовой линии (1.0 = 100%%)'
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Записать результаты как новую базовую линию'
+        )
+
+    def handle(self, *args, **options):
+        sizes = {name: options[name] for name in DEFAULT_SIZES}
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            results = measure(seed(sizes), options['iterations'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        self.print_results(results)
+        if options['update_baseline']:
+            with open(options['baseline'], 'w', encoding='utf8') as file:
+                json.dump(
+                    {'sizes': sizes, 'routes': results}, file, indent=2
+                )
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS('Базовая линия обновлена'))
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline'], encoding='utf8') as file:
+            baseline = json.load(file)
+        if baseline['sizes'] != sizes:
+            self.stdout.write(self.style.WARNING(
+                'Размеры данных отличаются от базовой линии, сравнение '
+                'пропущено'
+            ))
+            return
+        regressions = compare(
+            results, baseline['routes'], options['latency_tolerance']
+        )
+        if regressions:
+            raise CommandError('Регрессии:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
+
+    def print_results(self, results):
+        self.stdout.write(
+            f'{"маршрут":<24}{"запросы":>9}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"память, КБ":>12}'
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:<24}{result["queries"]:>9}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}{result["peak_kb"]:>12}'
+            )
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+from rest_framework.authtoken.models import Token
+
+from api.benchmark import DEFAULT_SIZES, seed
+from api.loadtest import ROUTES, compare_modes
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и хвостовую задержку горячих '
+        'маршрутов чтения при запуске через WSGI и ASGI'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument(
+            '--seed', action='store_true',
+            help='Запустить на временной базе с синтетическими данными'
+        )
+
+    def handle(self, *args, **options):
+        if not options['seed']:
+            return self.run(options, {})
+        if connection.vendor == 'sqlite':
+            raise CommandError(
+                'Серверы не видят временную базу SQLite в памяти, '
+                'для --seed нужна PostgreSQL'
+            )
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        test_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True
+        )
+        try:
+            seed(DEFAULT_SIZES)
+            self.run(options, {'DB_NAME': test_name})
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def run(self, options, env):
+        user = User.objects.filter(follower__isnull=False).first()
+        recipe = Recipe.objects.values_list('id', flat=True).first()
+        if user is None or recipe is None:
+            raise CommandError(
+                'Нужны рецепты и пользователь с подписками, запустите '
+                'команду с --seed'
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        urls = [url.format(recipe=recipe) for url in ROUTES]
+        results = compare_modes(
+            urls, token.key, options['port'], options['workers'],
+            options['concurrency'], options['duration'], env,
+        )
+        self.stdout.write(
+            f'{"режим":<8}{"запр./с":>10}{"p50, мс":>10}{"p95, мс":>10}'
+            f'{"p99, мс":>10}{"ошибки":>9}'
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f'{mode:<8}{result["rps"]:>10}{result["p50_ms"]:>10}'
+                f'{result["p95_ms"]:>10}{result["p99_ms"]:>10}'
+                f'{result["errors"]:>9}'
+            )
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from api.cache import LRUCache, get_revision, publish_revision
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+SOURCES = {
+    'favorites': (Favorite, 'recipe_id'),
+    'cart': (ShoppingCart, 'recipe_id'),
+    'follows': (Follow, 'author_id'),
+}
+
+
+class LocMemBackend:
+    """Множества в памяти процесса, вытеснение по LRU.
+
+    Запись действительна, пока не изменилась метка ревизии ключа в общем
+    кэше Django, поэтому сброс в одном воркере виден остальным.
+    """
+
+    def __init__(self, max_users=1000, ttl=None):
+        self.cache = LRUCache(max_users * len(SOURCES), ttl)
+        self.ttl = ttl
+
+    def get_or_load(self, key, load):
+        revision = get_revision(key)
+        cached = self.cache.get(key)
+        if cached is None or cached[1] != revision:
+            cached = load(), revision
+            self.cache.set(key, cached)
+        return cached[0]
+
+    def delete(self, key):
+        self.cache.delete(key)
+        publish_revision(key, self.ttl)
+
+
+class DjangoCacheBackend:
+    """Множества в кэше Django, общем для всех воркеров."""
+
+    def __init__(self, alias='default', ttl=None):
+        self.cache = caches[alias]
+        self.ttl = ttl
+
+    def get_or_load(self, key, load):
+        value = self.cache.get(key)
+        if value is None:
+            value = load()
+            self.cache.set(key, value, self.ttl)
+        return value
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        config = settings.MEMBERSHIP_CACHE
+        _backend = import_string(config['BACKEND'])(
+            **config.get('OPTIONS', {})
+        )
+    return _backend
+
+
+def get_ids(kind, user):
+    """Множество id рецептов (или авторов), связанных с пользователем."""
+    if not user.is_authenticated:
+        return frozenset()
+    model, field = SOURCES[kind]
+    return get_backend().get_or_load(
+        f'membership:{kind}:{user.id}',
+        lambda: frozenset(model.objects.filter(
+            user_id=user.id
+        ).values_list(field, flat=True))
+    )
+
+
+def favorite_ids(user):
+    return get_ids('favorites', user)
+
+
+def cart_ids(user):
+    return get_ids('cart', user)
+
+
+def follow_ids(user):
+    return get_ids('follows', user)
+
+
+def invalidate(kind, user_id):
+    key = f'membership:{kind}:{user_id}'
+    get_backend().delete(key)
+    transaction.on_commit(lambda: get_backend().delete(key))
@@ -0,0 +1,117 @@
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+
+
+def fingerprint(sql):
+    return IN_LISTS.sub('(...)', LITERALS.sub('?', sql))
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+
+class RequestProfilingMiddleware:
+    """Число и время SQL-запросов, время представления и повторяющиеся
+    (N+1) запросы для каждого запроса.
+
+    Метрики отдаются в заголовке Server-Timing и пишутся в лог строкой
+    JSON: db — время SQL, view — код представления без SQL (в основном
+    сериализация), render — рендеринг ответа и остальные middleware.
+    Включается настройкой REQUEST_PROFILING; в выключенном состоянии
+    Django не добавляет middleware в цепочку вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request.view_started = None
+        request.view_duration = None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(recorder)
+                )
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        if request.view_duration is None and request.view_started:
+            request.view_duration = finished - request.view_started
+        total = finished - started
+        self.report(request, response, recorder, total)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        if request.view_started is not None:
+            request.view_duration = (
+                time.perf_counter() - request.view_started
+            )
+        return response
+
+    def report(self, request, response, recorder, total):
+        view = request.view_duration or 0.0
+        metrics = {
+            'db': recorder.duration,
+            'view': max(view - recorder.duration, 0.0),
+            'render': max(total - view, 0.0),
+            'total': total,
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.2f}'
+            for name, duration in metrics.items()
+        ) + f', queries;desc="{recorder.count}"'
+        duplicates = {
+            sql: count
+            for sql, count in recorder.fingerprints.most_common()
+            if count > 1
+        }
+        over_budget = recorder.count > settings.REQUEST_PROFILING_QUERY_BUDGET
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'over_budget': over_budget,
+            **{
+                f'{name}_ms': round(duration * 1000, 2)
+                for name, duration in metrics.items()
+            },
+            'duplicates': duplicates,
+        }
+        logger.log(
+            logging.WARNING if over_budget else logging.INFO,
+            json.dumps(record, ensure_ascii=False)
+        )
@@ -0,0 +1,69 @@
+from calendar import timegm
+from hashlib import md5
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    """ETag и Last-Modified для list/retrieve по метке версии модели.
+
+    Версия определяется отдельным лёгким запросом (максимальный updated_at
+    и число строк), поэтому на 304 объекты не загружаются и не
+    сериализуются. Методы get_list_version/get_object_version возвращают
+    пару (ключ версии, дата изменения) или None, если условные запросы
+    для действия не используются.
+    """
+
+    def get_list_version(self):
+        version = self.queryset.model.objects.aggregate(
+            last_modified=Max('updated_at'), count=Count('id')
+        )
+        return version['count'], version['last_modified']
+
+    def get_object_version(self):
+        try:
+            last_modified = self.queryset.model.objects.filter(
+                pk=self.kwargs[self.lookup_field]
+            ).values_list('updated_at', flat=True).first()
+        except (ValueError, ValidationError):
+            return None
+        if last_modified is None:
+            return None
+        return None, last_modified
+
+    def conditional_response(self, request, version, handler, *args,
+                             **kwargs):
+        if version is None:
+            return handler(request, *args, **kwargs)
+        key, last_modified = version
+        etag = quote_etag(md5(
+            f'{key}:{last_modified}:{request.get_full_path()}'.encode()
+        ).hexdigest())
+        timestamp = (
+            timegm(last_modified.utctimetuple()) if last_modified else None
+        )
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_list_version(), super().list, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            request, self.get_object_version(), super().retrieve,
+            *args, **kwargs
+        )
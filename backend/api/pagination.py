@@ -1,5 +1,34 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+from api.filters import RECIPE_ORDERINGS
 
 
 class Pagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Keyset-пагинация по выбранной сортировке (по умолчанию -id):
+    без OFFSET и без подсчёта COUNT(*)."""
+
+    ordering = '-id'
+    page_size_query_param = 'limit'
+
+    def get_ordering(self, request, queryset, view):
+        return RECIPE_ORDERINGS.get(
+            request.query_params.get('ordering'), (self.ordering,)
+        )
+
+    @classmethod
+    def is_requested(cls, request):
+        return (
+            cls.cursor_query_param in request.query_params
+            or request.query_params.get('pagination') == 'cursor'
+        )
+
+
+class FeedPagination(CursorPagination):
+    """Keyset-пагинация ленты подписок по id рецепта."""
+
+    ordering = '-id'
+    page_size_query_param = 'limit'
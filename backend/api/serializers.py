@@ -1,12 +1,19 @@
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
 
+from api.images import (
+    RecipeImageField, RenditionImageField, schedule_renditions
+)
+from api.membership import cart_ids, favorite_ids, follow_ids
 from recipes.models import (
     Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart, Tag
 )
+from recipes.shopping_list import recalculate
 from users.models import Follow, User
 
 
@@ -40,9 +47,7 @@ class CustomUserSerializer(UserSerializer):
 
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
-        if not user.is_authenticated:
-            return False
-        return user.follower.filter(author=obj).exists()
+        return obj.id in follow_ids(user)
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -100,34 +105,30 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
-            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time'
+            'is_in_shopping_cart', 'name', 'image', 'text', 'cooking_time',
+            'servings'
         )
         read_only_fields = ('is_favorite', 'is_shopping_cart',)
 
     def get_is_favorited(self, obj):
         user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Recipe.objects.filter(
-            favorites__user=user, id=obj.id).exists()
+        return obj.id in favorite_ids(user)
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Recipe.objects.filter(cart__user=user, id=obj.id).exists()
+        return obj.id in cart_ids(user)
 
 
 class CreateRecipeSerializer(serializers.ModelSerializer):
     author = CustomUserSerializer(read_only=True)
-    image = Base64ImageField(max_length=None, use_url=True)
+    image = RecipeImageField(max_length=None, use_url=True)
     ingredients = AddIngredientSerializer(many=True)
 
     class Meta:
         model = Recipe
         fields = (
             'author', 'tags', 'ingredients', 'name',
-            'image', 'text', 'cooking_time'
+            'image', 'text', 'cooking_time', 'servings'
         )
 
     def validate(self, data):
@@ -141,20 +142,19 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Нужно добавить ингредиент"
             )
-        ingredient_list = []
-        for ingredient_item in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient, id=ingredient_item['id']
+        ingredient_ids = [item['id'] for item in ingredients]
+        if len(set(ingredient_ids)) != len(ingredient_ids):
+            raise serializers.ValidationError(
+                'Ингредиент уже добавлен'
+            )
+        if len(Ingredient.objects.in_bulk(ingredient_ids)) != len(
+            ingredient_ids
+        ):
+            raise NotFound('Ингредиент не найден')
+        if any(int(item['amount']) < 1 for item in ingredients):
+            raise serializers.ValidationError(
+                'Минимальное количество ингредиента = 1'
             )
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    'Ингредиент уже добавлен'
-                )
-            ingredient_list.append(ingredient)
-            if int(ingredient_item['amount']) < 1:
-                raise serializers.ValidationError(
-                    'Минимальное количество ингредиента = 1'
-                )
         cooking_time = data['cooking_time']
         if int(cooking_time) < 1:
             raise serializers.ValidationError(
@@ -163,13 +163,43 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         return data
 
     def add_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            IngredientRecipe.objects.create(
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(
                 recipe=recipe,
                 ingredient_id=ingredient['id'],
                 amount=ingredient['amount'],
             )
+            for ingredient in ingredients
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        existing = {
+            item.ingredient_id: item
+            for item in recipe.recipe_ingredient.all()
+        }
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        IngredientRecipe.objects.filter(
+            id__in=[
+                item.id for ingredient_id, item in existing.items()
+                if ingredient_id not in amounts
+            ]
+        ).delete()
+        changed = []
+        for ingredient_id, item in existing.items():
+            amount = amounts.pop(ingredient_id, item.amount)
+            if item.amount != amount:
+                item.amount = amount
+                changed.append(item)
+        IngredientRecipe.objects.bulk_update(changed, ('amount',))
+        self.add_ingredients(
+            [
+                {'id': ingredient_id, 'amount': amount}
+                for ingredient_id, amount in amounts.items()
+            ],
+            recipe
+        )
+
+    @transaction.atomic
     def create(self, validated_data):
         tags_data = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
@@ -177,23 +207,41 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(image=image, **validated_data)
         self.add_ingredients(ingredients_data, recipe)
         recipe.tags.set(tags_data)
+        schedule_renditions(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.add_ingredients(ingredients, instance)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        return super().update(instance, validated_data)
+        with recalculate(ShoppingCart.objects.filter(recipe=instance)):
+            self.update_ingredients(ingredients, instance)
+            instance.tags.set(tags)
+            if 'image' in validated_data:
+                validated_data.update(thumbnail='', card_image='')
+                schedule_renditions(instance)
+            return super().update(instance, validated_data)
 
     def to_representation(self, instance):
         context = self.context
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientRecipe.objects.select_related('ingredient')
+            ),
+        )
         return RecipeSerializer(instance, context=context).data
 
 
+class RecipeListSerializer(RecipeSerializer):
+    image = RenditionImageField('card_image')
+
+
 class SimpleRecipeSerializer(serializers.ModelSerializer):
+    image = RenditionImageField('thumbnail')
+
     class Meta:
         model = Recipe
         fields = 'id', 'name', 'image', 'cooking_time'
@@ -253,17 +301,44 @@ class FollowSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        return Follow.objects.filter(
-            user=request.user, author=obj.author
-        ).exists()
+        return obj.user_id == request.user.id
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        queryset = Recipe.objects.filter(author=obj.author)
-        if limit:
-            queryset = queryset[:int(limit)]
+        if hasattr(obj.author, 'recipes_preview'):
+            queryset = obj.author.recipes_preview
+        else:
+            request = self.context.get('request')
+            limit = request.GET.get('recipes_limit')
+            queryset = Recipe.objects.filter(author=obj.author)
+            if limit:
+                queryset = queryset[:int(limit)]
         return SimpleRecipeSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
+        counters = getattr(obj.author, 'counters', None)
+        if counters is None:
+            return obj.author.recipes.count()
+        return counters.recipes_count
+
+
+class MatchIngredientsSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False
+    )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=100
+    )
+
+    def validate_recipes(self, recipes):
+        if Recipe.objects.filter(id__in=recipes).count() != len(set(recipes)):
+            raise NotFound('Рецепт не найден')
+        return recipes
+
+
+class CartServingsSerializer(serializers.Serializer):
+    servings = serializers.IntegerField(min_value=1, max_value=1000)
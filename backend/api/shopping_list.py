@@ -0,0 +1,81 @@
+from decimal import Decimal
+from functools import lru_cache
+
+from recipes.models import ShoppingListItem
+
+UNIT_CONVERSIONS = {
+    'мг': ('г', Decimal('0.001')),
+    'г': ('г', Decimal(1)),
+    'кг': ('г', Decimal(1000)),
+    'мл': ('мл', Decimal(1)),
+    'л': ('мл', Decimal(1000)),
+}
+DISPLAY_UNITS = {
+    'г': (
+        (Decimal(1000), 'кг'), (Decimal(1), 'г'), (Decimal('0.001'), 'мг')
+    ),
+    'мл': ((Decimal(1000), 'л'), (Decimal(1), 'мл')),
+}
+DISPLAY_PRECISION = Decimal('0.01')
+
+
+@lru_cache(maxsize=None)
+def get_conversion(measurement_unit):
+    """Базовая единица и множитель для единицы измерения ингредиента.
+
+    Несовместимые с таблицей единицы остаются как есть с множителем 1.
+    """
+    unit = measurement_unit.strip().lower().rstrip('.')
+    return UNIT_CONVERSIONS.get(unit, (measurement_unit, Decimal(1)))
+
+
+def to_display(base_unit, amount):
+    """Единица выбирается до округления: из подходящих - самая крупная,
+    в которой количество не меньше единицы, иначе самая мелкая. Ненулевое
+    количество, которое округлилось бы до нуля, показывается с двумя
+    значащими цифрами.
+    """
+    units = DISPLAY_UNITS.get(base_unit, ())
+    for factor, unit in units:
+        if amount >= factor:
+            break
+    if units and amount:
+        amount /= factor
+        base_unit = unit
+    rounded = amount.quantize(DISPLAY_PRECISION)
+    if not rounded and amount:
+        rounded = amount.quantize(Decimal(1).scaleb(amount.adjusted() - 1))
+    amount = rounded.normalize()
+    if amount == amount.to_integral_value():
+        return base_unit, int(amount)
+    return base_unit, float(amount)
+
+
+def aggregate(rows):
+    """Сводит строки (название, единица, количество) по совместимым единицам.
+
+    Количества переводятся в базовую единицу (г, мл), одноимённые продукты
+    объединяются, а итог округляется до удобной единицы: 1500 г -> 1.5 кг.
+    """
+    totals = {}
+    for name, measurement_unit, amount in rows:
+        base_unit, factor = get_conversion(measurement_unit)
+        key = (name, base_unit)
+        totals[key] = totals.get(key, 0) + Decimal(str(amount)) * factor
+    return [
+        (name, *to_display(base_unit, amount))
+        for (name, base_unit), amount in sorted(totals.items())
+    ]
+
+
+def get_shopping_list(user):
+    """Сводный список покупок пользователя: (название, единица, количество).
+
+    Читается из материализованной таблицы ShoppingListItem, которую
+    поддерживает recipes.shopping_list.
+    """
+    return aggregate(
+        ShoppingListItem.objects.filter(user=user).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        )
+    )
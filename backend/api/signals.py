@@ -0,0 +1,45 @@
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api import membership
+from api.authentication import invalidate_token, invalidate_user_tokens
+from api.autocomplete import invalidate_ingredient_index
+from api.db import check_connections
+from recipes.models import Favorite, Ingredient, ShoppingCart
+from users.models import Follow, User
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    membership.invalidate('cart', instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def favorite_changed(sender, instance, **kwargs):
+    membership.invalidate('favorites', instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follow_changed(sender, instance, **kwargs):
+    membership.invalidate('follows', instance.user_id)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    invalidate_ingredient_index()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if not created:
+        invalidate_user_tokens(instance.id)
+
+
+request_started.connect(check_connections)
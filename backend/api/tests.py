@@ -0,0 +1,503 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.filters import RecipeFilter
+from api.shopping_list import aggregate
+from api.user_recipes import add_recipes
+from recipes.models import (
+    Favorite, Ingredient, IngredientRecipe, Recipe, ShoppingCart,
+    ShoppingListItem, Tag
+)
+from recipes.shopping_list import find_drift
+from users.models import Follow, User
+
+
+class RecipeListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        authors = [
+            User.objects.create_user(
+                username=f'author{i}', email=f'author{i}@example.com',
+                first_name='Имя', last_name='Фамилия', password='password123'
+            )
+            for i in range(3)
+        ]
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(5)
+        ]
+        recipes = []
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', author=authors[i % len(authors)],
+                image='recipes/test.png', text='Описание', cooking_time=10,
+            )
+            recipe.tags.set(tags[:i % len(tags) + 1])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in ingredients[:i % len(ingredients) + 1]
+            )
+            recipes.append(recipe)
+        for author in authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+        add_recipes(Favorite, cls.user, [recipe.id for recipe in recipes[::2]])
+        add_recipes(
+            ShoppingCart, cls.user, [recipe.id for recipe in recipes[1::2]]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(context.captured_queries)
+
+    def test_queries_do_not_depend_on_page_size(self):
+        self.count_queries('/api/recipes/?limit=1')
+        response, one = self.count_queries('/api/recipes/?limit=1')
+        self.assertEqual(len(response.data['results']), 1)
+        response, many = self.count_queries('/api/recipes/?limit=10')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(one, many)
+
+
+class RecipeTagFilterTest(TestCase):
+    """Фильтр по тегам - подзапрос EXISTS без JOIN и DISTINCT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        cls.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        cls.recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', author=author,
+                image='recipes/test.png', text='Описание', cooking_time=10,
+            )
+            recipe.tags.set(cls.tags[:i + 1])
+            cls.recipes.append(recipe)
+
+    def test_recipe_matching_several_tags_is_returned_once(self):
+        with CaptureQueriesContext(connection) as context:
+            response = APIClient().get(
+                '/api/recipes/?tags=tag0&tags=tag1&tags=tag2&limit=10'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], len(self.recipes))
+        self.assertCountEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [recipe.id for recipe in self.recipes]
+        )
+        through = connection.ops.quote_name(
+            Recipe.tags.through._meta.db_table
+        )
+        filtered = [
+            query['sql'] for query in context.captured_queries
+            if 'EXISTS' in query['sql']
+        ]
+        self.assertTrue(filtered)
+        for sql in filtered:
+            self.assertNotIn('DISTINCT', sql)
+            self.assertNotIn(f'JOIN {through}', sql)
+
+
+class RecipeFilterPlanTest(TestCase):
+    """Подзапросы фильтров по тегам, избранному и корзине идут по
+    составным индексам связующих таблиц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}',
+                               slug=f'tag{i}')
+            for i in range(3)
+        ]
+        recipes = []
+        for i in range(10):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', author=cls.user,
+                image='recipes/test.png', text='Описание', cooking_time=10,
+            )
+            recipe.tags.set(tags[:i % len(tags) + 1])
+            recipes.append(recipe)
+        add_recipes(Favorite, cls.user, [recipe.id for recipe in recipes])
+        add_recipes(ShoppingCart, cls.user, [recipe.id for recipe in recipes])
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def filtered(self, query):
+        request = RequestFactory().get('/api/recipes/')
+        request.user = self.user
+        return RecipeFilter(
+            QueryDict(query), queryset=Recipe.objects.all(), request=request
+        ).qs
+
+    def indexes(self, model, columns):
+        """Имена индексов и ограничений уникальности по этим столбцам."""
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, table
+            )
+        names = [
+            name for name, constraint in constraints.items()
+            if (constraint['index'] or constraint['unique'])
+            and set(constraint['columns']) == set(columns)
+        ]
+        if connection.vendor == 'sqlite':
+            names.append(f'sqlite_autoindex_{table}_')
+        return names
+
+    def assertPlanUses(self, queryset, names):
+        plan = queryset.explain()
+        self.assertTrue(
+            any(name in plan for name in names),
+            f'Ни один из индексов {names} не используется:\n{plan}'
+        )
+
+    def test_tags_filter_uses_index(self):
+        self.assertPlanUses(
+            self.filtered('tags=tag0&tags=tag1'),
+            self.indexes(Recipe.tags.through, ('tag_id', 'recipe_id'))
+        )
+
+    def test_favorite_filter_uses_index(self):
+        self.assertPlanUses(
+            self.filtered('is_favorited=1'),
+            self.indexes(Favorite, ('user_id', 'recipe_id'))
+        )
+
+    def test_cart_filter_uses_index(self):
+        self.assertPlanUses(
+            self.filtered('is_in_shopping_cart=1'),
+            self.indexes(ShoppingCart, ('user_id', 'recipe_id'))
+        )
+
+
+class RecipeMatchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(3)
+        ]
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', author=author,
+            image='recipes/test.png', text='Описание', cooking_time=10,
+        )
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=cls.recipe, ingredient=ingredient,
+                             amount=100)
+            for ingredient in cls.ingredients
+        )
+
+    def test_match_ignores_cursor_pagination(self):
+        response = APIClient().post(
+            '/api/recipes/match/?pagination=cursor',
+            {'ingredients': [self.ingredients[0].id]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        result = response.data['results'][0]
+        self.assertEqual(result['id'], self.recipe.id)
+        self.assertEqual(result['matched_count'], 1)
+        self.assertEqual(result['missing_count'], 2)
+
+
+class ShoppingListTableTest(TestCase):
+    """Сводный список покупок совпадает с корзиной после каждой операции."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(4)
+        ]
+        cls.recipes = []
+        for i in range(3):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт {i}', author=cls.author, servings=2,
+                image='recipes/test.png', text='Описание', cooking_time=10,
+            )
+            recipe.tags.set([cls.tag])
+            IngredientRecipe.objects.bulk_create(
+                IngredientRecipe(recipe=recipe, ingredient=ingredient,
+                                 amount=100)
+                for ingredient in cls.ingredients[i:i + 2]
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def amounts(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'amount'))
+
+    def assertConsistent(self):
+        self.assertEqual(find_drift([self.user.id, self.author.id]), set())
+        call_command('rebuild_shopping_lists', '--check', stdout=StringIO())
+
+    def add(self, *recipes):
+        response = self.client.post(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [recipe.id for recipe in recipes]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_add_and_remove_single(self):
+        recipe = self.recipes[0]
+        url = f'/api/recipes/{recipe.id}/shopping_cart/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertConsistent()
+        self.assertEqual(self.amounts(), {
+            self.ingredients[0].id: 100, self.ingredients[1].id: 100
+        })
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertConsistent()
+        self.assertEqual(self.amounts(), {})
+
+    def test_add_and_remove_batch(self):
+        self.add(self.recipes[0])
+        self.add(*self.recipes)
+        self.assertConsistent()
+        self.assertEqual(self.amounts()[self.ingredients[1].id], 200)
+        response = self.client.delete(
+            '/api/recipes/shopping_cart/',
+            {'recipes': [self.recipes[0].id, self.recipes[1].id]},
+            format='json'
+        )
+        print(response.status_code, response.data)
+        self.assertEqual(response.data['removed'], 2)
+        self.assertConsistent()
+        self.assertEqual(self.amounts(), {
+            self.ingredients[2].id: 100, self.ingredients[3].id: 100
+        })
+
+    def test_servings_patch(self):
+        self.add(self.recipes[0])
+        response = self.client.patch(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/',
+            {'servings': 5}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+        self.assertEqual(self.amounts()[self.ingredients[0].id], 250)
+
+    def test_recipe_update(self):
+        self.client.post(
+            f'/api/recipes/{self.recipes[0].id}/shopping_cart/',
+            {'servings': 2}, format='json'
+        )
+        self.add(self.recipes[1])
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.patch(
+            f'/api/recipes/{self.recipes[0].id}/',
+            {
+                'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+                'servings': 4, 'tags': [self.tag.id],
+                'ingredients': [
+                    {'id': self.ingredients[1].id, 'amount': 40},
+                    {'id': self.ingredients[3].id, 'amount': 80},
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertConsistent()
+        self.assertEqual(self.amounts(), {
+            self.ingredients[1].id: 120,
+            self.ingredients[2].id: 100,
+            self.ingredients[3].id: 40,
+        })
+
+    def test_recipe_delete(self):
+        self.add(self.recipes[0], self.recipes[1])
+        client = APIClient()
+        client.force_authenticate(self.author)
+        response = client.delete(f'/api/recipes/{self.recipes[1].id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertConsistent()
+        self.assertEqual(self.amounts(), {
+            self.ingredients[0].id: 100, self.ingredients[1].id: 100
+        })
+
+
+class UserRecipesTest(TestCase):
+    """Коды ответов избранного и корзины и счётчики рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт {i}', author=cls.user,
+                image='recipes/test.png', text='Описание', cooking_time=10,
+            )
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_duplicate_post(self):
+        for kind in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{self.recipes[0].id}/{kind}/'
+            self.assertEqual(self.client.post(url).status_code, 201)
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('errors', response.data)
+        recipe = Recipe.objects.get(pk=self.recipes[0].pk)
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.cart_count, 1)
+
+    def test_delete_missing(self):
+        for kind in ('favorite', 'shopping_cart'):
+            response = self.client.delete(
+                f'/api/recipes/{self.recipes[0].id}/{kind}/'
+            )
+            self.assertEqual(response.status_code, 400)
+            response = self.client.delete(f'/api/recipes/999999/{kind}/')
+            self.assertEqual(response.status_code, 404)
+
+    def test_overlapping_batch(self):
+        url = '/api/recipes/shopping_cart/'
+        first, second, third = self.recipes
+        self.client.post(url, {'recipes': [first.id, second.id]},
+                         format='json')
+        response = self.client.post(
+            url, {'recipes': [second.id, third.id]}, format='json'
+        )
+        self.assertEqual(response.data['added'], 1)
+        response = self.client.delete(
+            url, {'recipes': [first.id, 999999]}, format='json'
+        )
+        self.assertEqual(response.status_code, 404)
+        response = self.client.delete(
+            url, {'recipes': [first.id, third.id]}, format='json'
+        )
+        self.assertEqual(response.data['removed'], 2)
+        self.assertEqual(
+            dict(Recipe.objects.values_list('id', 'cart_count')),
+            {first.id: 0, second.id: 1, third.id: 0}
+        )
+
+
+class ShoppingListDisplayTest(SimpleTestCase):
+
+    def test_units(self):
+        self.assertEqual(aggregate([
+            ('соль', 'мг', 5),
+            ('мука', 'г', 0.5),
+            ('сахар', 'г', 1500),
+            ('сахар', 'кг', 0.5),
+            ('перец', 'г', 0.0001),
+            ('яйца', 'шт', 0.004),
+        ]), [
+            ('мука', 'мг', 500),
+            ('перец', 'мг', 0.1),
+            ('сахар', 'кг', 2),
+            ('соль', 'мг', 5),
+            ('яйца', 'шт', 0.004),
+        ])
+
+
+class RecipeDetailVersionTest(TestCase):
+    """ETag рецепта меняется при правке вложенных тегов, ингредиентов и
+    автора."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password123'
+        )
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredient = Ingredient.objects.create(
+            name='ингредиент', measurement_unit='г'
+        )
+        cls.recipe = Recipe.objects.create(
+            name='Рецепт', author=cls.author,
+            image='recipes/test.png', text='Описание', cooking_time=10,
+        )
+        cls.recipe.tags.set([cls.tag])
+        IngredientRecipe.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=100
+        )
+
+    def test_nested_changes_update_etag(self):
+        client = APIClient()
+        url = f'/api/recipes/{self.recipe.id}/'
+        etag = client.get(url)['ETag']
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        for obj, field in (
+            (self.tag, 'name'),
+            (self.ingredient, 'measurement_unit'),
+            (self.author, 'first_name'),
+        ):
+            setattr(obj, field, 'изменено')
+            obj.save()
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, field)
+            etag = response['ETag']
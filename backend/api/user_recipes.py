@@ -0,0 +1,68 @@
+"""Добавление и удаление рецептов в избранном и корзине.
+
+Каждая операция устойчива к повторам и гонкам: INSERT ... ON CONFLICT DO
+NOTHING и DELETE с числом удалённых строк. Строки корзины перед удалением
+блокируются, и из списка покупок вычитается вклад только тех строк,
+которые удаляет эта транзакция.
+Сигналы моделей при этом не срабатывают, поэтому счётчики рецептов,
+сводный список покупок и кэши пользователя обновляются здесь явно.
+"""
+from django.db import transaction
+
+from api import membership
+from api.db import delete_rows, insert_ignore
+from recipes.counters import sync_recipe_counters
+from recipes.models import Favorite, ShoppingCart
+from recipes.shopping_list import apply_delta, lock, rebuild, recalculate
+
+MEMBERSHIP_KINDS = {
+    Favorite: 'favorites',
+    ShoppingCart: 'cart',
+}
+
+
+def changed(model, user_id):
+    membership.invalidate(MEMBERSHIP_KINDS[model], user_id)
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids, **fields):
+    """Возвращает число добавленных рецептов."""
+    recipe_ids = sorted(set(recipe_ids))
+    added = insert_ignore([
+        model(user=user, recipe_id=recipe_id, **fields)
+        for recipe_id in recipe_ids
+    ])
+    if added:
+        sync_recipe_counters(model, recipe_ids, len(recipe_ids), added, 1)
+        changed(model, user.id)
+        if model is ShoppingCart:
+            if added == len(recipe_ids):
+                apply_delta(ShoppingCart.objects.filter(
+                    user=user, recipe_id__in=recipe_ids
+                ))
+            else:
+                rebuild((user.id,))
+    return added
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """Возвращает число удалённых рецептов."""
+    recipe_ids = sorted(set(recipe_ids))
+    rows = model.objects.filter(user=user, recipe_id__in=recipe_ids)
+    if model is ShoppingCart:
+        rows = lock(rows)
+        apply_delta(rows, -1)
+    removed = delete_rows(rows)
+    if removed:
+        sync_recipe_counters(model, recipe_ids, len(recipe_ids), removed, -1)
+        changed(model, user.id)
+    return removed
+
+
+def set_servings(user, recipe_id, servings):
+    """Меняет число порций рецепта в корзине, возвращает число строк."""
+    carts = ShoppingCart.objects.filter(user=user, recipe_id=recipe_id)
+    with recalculate(carts):
+        return carts.update(servings=servings)
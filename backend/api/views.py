@@ -1,5 +1,6 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import OuterRef, Prefetch, Subquery
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
@@ -9,17 +10,29 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet
 
+from recipes.feed import get_feed
+from recipes.matching import get_match_index
 from recipes.models import (
     Favorite, Ingredient, Recipe, ShoppingCart, Tag, IngredientRecipe
 )
 from users.models import Follow, User
+from api.autocomplete import get_ingredient_index
+from api.exporters import EXPORT_FORMATS, export_response
 from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import Pagination
+from api.membership import cart_ids, favorite_ids, follow_ids
+from api.mixins import ConditionalGetMixin
+from api.pagination import (
+    FeedPagination, Pagination, RecipeCursorPagination
+)
 from api.permissions import IsAuthorOrReadOnly
 from api.serializers import (
-    CreateRecipeSerializer, FollowSerializer, IngredientSerializer,
-    RecipeSerializer, SimpleRecipeSerializer, TagSerializer
+    CartServingsSerializer, CreateRecipeSerializer, FollowSerializer,
+    IngredientSerializer, MatchIngredientsSerializer, RecipeIdsSerializer,
+    RecipeListSerializer, RecipeSerializer, SimpleRecipeSerializer,
+    TagSerializer
 )
+from api.shopping_list import get_shopping_list
+from api.user_recipes import add_recipes, remove_recipes, set_servings
 
 
 class CustomUserViewSet(UserViewSet):
@@ -66,7 +79,21 @@ class CustomUserViewSet(UserViewSet):
     @action(detail=False, permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
         user = request.user
-        queryset = Follow.objects.filter(user=user)
+        recipes = Recipe.objects.all()
+        limit = request.GET.get('recipes_limit')
+        if limit:
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('id')[:int(limit)]
+            ))
+        queryset = Follow.objects.filter(user=user).select_related(
+            'author__counters'
+        ).prefetch_related(
+            Prefetch(
+                'author__recipes', queryset=recipes, to_attr='recipes_preview'
+            )
+        ).order_by('-id')
         pages = self.paginate_queryset(queryset)
         serializer = FollowSerializer(
             pages,
@@ -76,14 +103,14 @@ class CustomUserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class TagsViewSet(ReadOnlyModelViewSet):
+class TagsViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     permission_classes = (AllowAny, )
     serializer_class = TagSerializer
     pagination_class = None
 
 
-class IngredientsViewSet(ReadOnlyModelViewSet):
+class IngredientsViewSet(ConditionalGetMixin, ReadOnlyModelViewSet):
     permission_classes = (AllowAny, )
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -91,68 +118,219 @@ class IngredientsViewSet(ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name is None:
+            return super().list(request, *args, **kwargs)
+        return Response(get_ingredient_index().search(
+            name, settings.INGREDIENT_AUTOCOMPLETE_LIMIT
+        ))
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     pagination_class = Pagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action not in ('list', 'retrieve', 'match', 'feed'):
+            return queryset
+        return queryset.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredient',
+                queryset=IngredientRecipe.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.action == 'feed':
+                self._paginator = FeedPagination()
+            elif (
+                self.action == 'list'
+                and RecipeCursorPagination.is_requested(self.request)
+            ):
+                self._paginator = RecipeCursorPagination()
+        return super().paginator
+
+    def get_list_version(self):
+        return None
+
+    def get_object_version(self):
+        try:
+            version = Recipe.objects.filter(
+                pk=self.kwargs['pk']
+            ).annotate(
+                tags_modified=Subquery(Tag.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by('-updated_at').values('updated_at')[:1]),
+                ingredients_modified=Subquery(IngredientRecipe.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by('-ingredient__updated_at').values(
+                    'ingredient__updated_at'
+                )[:1]),
+            ).values_list(
+                'id', 'author_id', 'updated_at', 'tags_modified',
+                'ingredients_modified', 'author__username', 'author__email',
+                'author__first_name', 'author__last_name'
+            ).first()
+        except (ValueError, ValidationError):
+            return None
+        if version is None:
+            return None
+        recipe_id, author_id, *key = version
+        user = self.request.user
+        if user.is_authenticated:
+            key += (
+                recipe_id in favorite_ids(user),
+                recipe_id in cart_ids(user),
+                author_id in follow_ids(user),
+            )
+        return tuple(key), None
+
     def get_serializer_class(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in ('list', 'match', 'feed'):
+            return RecipeListSerializer
+        if self.action == 'retrieve':
             return RecipeSerializer
         return CreateRecipeSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def add_or_delete(self, request, pk, model):
-        recipe = get_object_or_404(Recipe, id=pk)
-        user = self.request.user
+    def add_or_delete(self, request, pk, model, exists_error, missing_error,
+                      **fields):
+        user = request.user
         if request.method == 'POST':
-            model.objects.create(recipe=recipe, user=user)
+            recipe = get_object_or_404(Recipe, id=pk)
+            if not add_recipes(model, user, (recipe.id,), **fields):
+                return Response({
+                    'errors': exists_error
+                }, status=status.HTTP_400_BAD_REQUEST)
             serializer = SimpleRecipeSerializer(recipe)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == 'DELETE':
-            obj = model.objects.filter(recipe=recipe, user=user)
-            obj.delete()
+        if pk.isdigit() and remove_recipes(model, user, (int(pk),)):
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, id=pk)
+        return Response({
+            'errors': missing_error
+        }, status=status.HTTP_400_BAD_REQUEST)
 
     @action(
         detail=True, methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,)
     )
     def favorite(self, request, pk):
-        return self.add_or_delete(request, pk, Favorite)
+        return self.add_or_delete(
+            request, pk, Favorite,
+            'Рецепт уже в избранном', 'Рецепта нет в избранном'
+        )
 
     @action(
         detail=True, methods=('post', 'delete'),
         permission_classes=(IsAuthenticated,)
     )
     def shopping_cart(self, request, pk):
-        return self.add_or_delete(request, pk, ShoppingCart)
+        fields = {}
+        if request.method == 'POST':
+            serializer = CartServingsSerializer(
+                data=request.data, partial=True
+            )
+            serializer.is_valid(raise_exception=True)
+            fields = serializer.validated_data
+        return self.add_or_delete(
+            request, pk, ShoppingCart,
+            'Рецепт уже в списке покупок', 'Рецепта нет в списке покупок',
+            **fields
+        )
+
+    @shopping_cart.mapping.patch
+    def shopping_cart_servings(self, request, pk):
+        serializer = CartServingsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        servings = serializer.validated_data['servings']
+        if pk.isdigit() and set_servings(request.user, int(pk), servings):
+            return Response({'id': int(pk), 'servings': servings})
+        get_object_or_404(Recipe, id=pk)
+        return Response({
+            'errors': 'Рецепта нет в списке покупок'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(
+        detail=False, methods=('post', 'delete'),
+        url_path='shopping_cart', url_name='shopping-cart-batch',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_batch(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if request.method == 'POST':
+            return Response({
+                'added': add_recipes(ShoppingCart, request.user, recipe_ids)
+            })
+        return Response({
+            'removed': remove_recipes(ShoppingCart, request.user, recipe_ids)
+        })
 
     @action(
         detail=False, methods=('get',),
         permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
-        ingredients = IngredientRecipe.objects.filter(
-            recipe__cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        shopping_list = '\n'.join(
-                f'* {ingredient["ingredient__name"]}'
-                f' ({ingredient["ingredient__measurement_unit"]})'
-                f' - {ingredient["amount"]}'
-                for ingredient in ingredients
+        file_format = request.query_params.get('file_format', 'txt')
+        if file_format not in EXPORT_FORMATS:
+            return Response({
+                'errors': 'Доступные форматы: ' + ', '.join(EXPORT_FORMATS)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return export_response(get_shopping_list(request.user), file_format)
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def shopping_cart_totals(self, request):
+        shopping_list = get_shopping_list(request.user)
+        return self.conditional_response(
+            request, (repr(shopping_list), None),
+            lambda request: Response([
+                {'name': name, 'measurement_unit': unit, 'amount': amount}
+                for name, unit, amount in shopping_list
+            ])
+        )
+
+    @action(detail=False, permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        page = self.paginate_queryset(
+            get_feed(request.user, self.get_queryset())
         )
-        response = HttpResponse(
-            shopping_list, content_type='text/plain'
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False, methods=('post',),
+        permission_classes=(AllowAny,)
+    )
+    def match(self, request):
+        serializer = MatchIngredientsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ranking = get_match_index().match(
+            serializer.validated_data['ingredients']
         )
-        response['Content-Disposition'] = (
-            'attacment; filename="ingredients_in_cart.txt"'
+        page = self.paginate_queryset(ranking)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
         )
-        return response
+        data = []
+        for recipe_id, matched, total in page:
+            if recipe_id not in recipes:
+                continue
+            item = self.get_serializer(recipes[recipe_id]).data
+            item['matched_count'] = matched
+            item['missing_count'] = total - matched
+            data.append(item)
+        return self.get_paginated_response(data)
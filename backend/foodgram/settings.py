@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,14 +83,103 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default=60)),
     }
 }
 
+DB_HEALTH_CHECKS = os.getenv('DB_HEALTH_CHECKS', default='True') == 'True'
+DB_POOL_MODE = os.getenv('DB_POOL_MODE', default='direct')
+if DB_POOL_MODE == 'pgbouncer':
+    DATABASES['default'].update(
+        HOST=os.getenv('PGBOUNCER_HOST', default='pgbouncer'),
+        PORT=os.getenv('PGBOUNCER_PORT', default='6432'),
+        DISABLE_SERVER_SIDE_CURSORS=True,
+    )
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INGREDIENT_AUTOCOMPLETE_LIMIT = int(
+    os.getenv('INGREDIENT_AUTOCOMPLETE_LIMIT', default=50)
+)
+INGREDIENT_INDEX_CHECK_INTERVAL = int(
+    os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', default=30)
+)
+
+MEMBERSHIP_CACHE = {
+    'BACKEND': 'api.membership.LocMemBackend',
+    'OPTIONS': {
+        'max_users': 1000,
+        'ttl': 300,
+    },
+}
+
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=60))
+
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', default=10 * 1024 * 1024)
+)
+IMAGE_RENDITIONS_ASYNC = True
+IMAGE_RENDITION_WORKERS = int(os.getenv('IMAGE_RENDITION_WORKERS', default=2))
+
+REQUEST_PROFILING = os.getenv('REQUEST_PROFILING', default='False') == 'True'
+REQUEST_PROFILING_QUERY_BUDGET = int(
+    os.getenv('REQUEST_PROFILING_QUERY_BUDGET', default=20)
+)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
+SEARCH_CONFIG = os.getenv('SEARCH_CONFIG', default='russian')
+SEARCH_FALLBACK_LIMIT = 1000
+
+MATCH_INDEX_CHECK_INTERVAL = int(
+    os.getenv('MATCH_INDEX_CHECK_INTERVAL', default=30)
+)
+
+FEED_MAX_ENTRIES = int(os.getenv('FEED_MAX_ENTRIES', default=500))
+FEED_TRIM_SLACK = int(os.getenv('FEED_TRIM_SLACK', default=50))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', default=100))
+FEED_FANOUT_THRESHOLD = int(
+    os.getenv('FEED_FANOUT_THRESHOLD', default=1000)
+)
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', default='False') == 'True'
+ASYNC_DB_POOL_SIZE = int(os.getenv('ASYNC_DB_POOL_SIZE', default=8))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -111,7 +201,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import async_read_urls
 from api.views import (
     CustomUserViewSet, IngredientsViewSet, RecipeViewSet, TagsViewSet,
 )
@@ -16,5 +17,5 @@ router.register('recipes', RecipeViewSet, basename='recipes')
 urlpatterns = [
     path('api/auth/', include('djoser.urls.authtoken')),
     path('admin/', admin.site.urls),
-    path('api/', include(router.urls)),
+    path('api/', include(async_read_urls(router.urls))),
 ]
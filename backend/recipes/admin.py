@@ -3,6 +3,7 @@ from recipes.models import (
     Ingredient, IngredientRecipe, Recipe, Tag,
     Favorite, ShoppingCart
 )
+from recipes.shopping_list import apply_delta
 
 
 class IngredientRecipeInLine(admin.TabularInline):
@@ -21,11 +22,21 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author')
+    list_display = ('id', 'name', 'author', 'favorites_count')
     search_fields = ('name', 'author')
     list_filter = ('name', 'author', 'tags')
     inlines = (IngredientRecipeInLine,)
 
+    def save_model(self, request, obj, form, change):
+        if change:
+            apply_delta(ShoppingCart.objects.filter(recipe=obj), -1)
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            apply_delta(ShoppingCart.objects.filter(recipe=form.instance))
+
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
@@ -0,0 +1,83 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow, User, UserCounters
+
+COUNTER_FIELDS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'cart_count',
+}
+RECIPE_COUNTERS = (
+    ('favorites_count', Favorite, 'recipe'),
+    ('cart_count', ShoppingCart, 'recipe'),
+)
+USER_COUNTERS = (
+    ('recipes_count', Recipe, 'author'),
+    ('followers_count', Follow, 'author'),
+)
+
+
+def count_by(model, field, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef(outer)}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def change_recipe_counter(recipe_id, field, delta):
+    change_recipe_counters((recipe_id,), field, delta)
+
+
+def change_recipe_counters(recipe_ids, field, delta):
+    recipes = Recipe.objects.filter(pk__in=recipe_ids)
+    if delta < 0:
+        recipes = recipes.filter(**{f'{field}__gte': -delta})
+    recipes.update(**{field: F(field) + delta})
+
+
+def reconcile(queryset, field, actual):
+    drifted = queryset.annotate(actual=actual).exclude(**{field: F('actual')})
+    return queryset.model.objects.filter(
+        pk__in=list(drifted.values_list('pk', flat=True))
+    ).update(**{field: actual})
+
+
+def sync_recipe_counters(model, recipe_ids, expected, changed, delta):
+    """Обновляет счётчики после массовой вставки/удаления без сигналов.
+
+    Если изменились все ожидаемые строки, счётчики сдвигаются на delta;
+    иначе (часть строк уже была или удалена параллельным запросом)
+    счётчики этих рецептов пересчитываются по таблице.
+    """
+    field = COUNTER_FIELDS[model]
+    if changed == expected:
+        change_recipe_counters(recipe_ids, field, delta)
+    else:
+        reconcile(
+            Recipe.objects.filter(pk__in=recipe_ids), field,
+            count_by(model, 'recipe')
+        )
+
+
+def reconcile_counters():
+    """Пересчитывает денормализованные счётчики, возвращает число
+    исправленных строк по каждому счётчику."""
+    UserCounters.objects.bulk_create(
+        UserCounters(user_id=user_id)
+        for user_id in User.objects.filter(
+            counters__isnull=True
+        ).values_list('pk', flat=True)
+    )
+    fixed = {}
+    for field, model, related in RECIPE_COUNTERS:
+        fixed[field] = reconcile(
+            Recipe.objects.all(), field, count_by(model, related)
+        )
+    for field, model, related in USER_COUNTERS:
+        fixed[field] = reconcile(
+            UserCounters.objects.all(), field,
+            count_by(model, related, 'user')
+        )
+    return fixed
@@ -0,0 +1,91 @@
+"""Лента рецептов авторов, на которых подписан пользователь.
+
+Новый рецепт раскладывается по лентам подписчиков при публикации
+(fan-out on write). Для авторов, у которых больше FEED_FANOUT_THRESHOLD
+подписчиков, раскладка не делается: их рецепты подмешиваются при чтении
+ленты. В ленте пользователя хранится не больше FEED_MAX_ENTRIES записей.
+"""
+from django.conf import settings
+from django.db.models import Count, Q
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow, UserCounters
+
+
+def is_fan_out_author(author_id):
+    followers = UserCounters.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    return (followers or 0) <= settings.FEED_FANOUT_THRESHOLD
+
+
+def trim(entries):
+    """Обрезает ленты, вышедшие за лимит больше чем на FEED_TRIM_SLACK,
+    чтобы не удалять по записи на каждую публикацию."""
+    overflowing = entries.values('user_id').annotate(
+        entries=Count('id')
+    ).filter(
+        entries__gt=settings.FEED_MAX_ENTRIES + settings.FEED_TRIM_SLACK
+    ).values_list('user_id', flat=True)
+    for user_id in list(overflowing):
+        oldest_kept = FeedEntry.objects.filter(user_id=user_id).order_by(
+            '-recipe_id'
+        ).values_list('recipe_id', flat=True)[settings.FEED_MAX_ENTRIES - 1]
+        FeedEntry.objects.filter(
+            user_id=user_id, recipe_id__lt=oldest_kept
+        ).delete()
+
+
+def fan_out(recipe_id, author_id):
+    if not is_fan_out_author(author_id):
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for user_id in Follow.objects.filter(
+                author_id=author_id
+            ).values_list('user_id', flat=True).iterator()
+        ),
+        batch_size=500, ignore_conflicts=True
+    )
+    trim(FeedEntry.objects.filter(user__follower__author_id=author_id))
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние рецепты автора."""
+    if not is_fan_out_author(author_id):
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id)
+            for recipe_id in Recipe.objects.filter(
+                author_id=author_id
+            ).order_by('-id').values_list(
+                'id', flat=True
+            )[:settings.FEED_BACKFILL_SIZE]
+        ),
+        ignore_conflicts=True
+    )
+    trim(FeedEntry.objects.filter(user_id=user_id))
+
+
+def remove_author(user_id, author_id):
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def get_feed(user, queryset=None):
+    """Рецепты ленты: разложенные записи и рецепты авторов, для которых
+    раскладка не делается."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    return queryset.filter(
+        Q(id__in=FeedEntry.objects.filter(user=user).values('recipe_id'))
+        | Q(author_id__in=Follow.objects.filter(
+            user=user,
+            author__counters__followers_count__gt=(
+                settings.FEED_FANOUT_THRESHOLD
+            )
+        ).values('author_id'))
+    )
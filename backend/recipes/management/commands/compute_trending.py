@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.rankings import compute_trending
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рейтинг популярности рецептов для сортировки '
+        '?ordering=trending (запускать периодически, например из cron)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--half-life-hours', type=float, default=48)
+
+    def handle(self, *args, **options):
+        count = compute_trending(
+            options['days'], options['half_life_hours']
+        )
+        self.stdout.write(f'Рассчитан рейтинг для {count} рецептов')
@@ -0,0 +1,113 @@
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import Ingredient, Tag
+
+
+def read_ingredients(path):
+    with open(path, encoding='utf8') as file:
+        if path.endswith('.json'):
+            for item in json.load(file):
+                yield item['name'], item['measurement_unit']
+        else:
+            for row in csv.reader(file):
+                yield row[0], row[1]
+
+
+def read_tags(path):
+    with open(path, encoding='utf8') as file:
+        for name, color, slug in csv.reader(file):
+            yield slug, name, color
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    batch = list(islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, size))
+
+
+class Command(BaseCommand):
+    help = 'Загружает ингредиенты и теги (повторный запуск безопасен)'
+
+    def add_arguments(self, parser):
+        data_dir = os.path.join(settings.BASE_DIR, 'data')
+        parser.add_argument(
+            '--ingredients',
+            default=os.path.join(data_dir, 'ingredients.csv'),
+            help='CSV (name,unit) или JSON со списком ингредиентов'
+        )
+        parser.add_argument(
+            '--tags', default=os.path.join(data_dir, 'tags.csv'),
+            help='CSV (name,color,slug) со списком тегов'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for path in (options['ingredients'], options['tags']):
+            if path and not os.path.exists(path):
+                raise CommandError(f'Файл {path} не найден')
+        with transaction.atomic():
+            if options['ingredients']:
+                self.report('Ингредиенты', *self.load_ingredients(
+                    options['ingredients'], options['batch_size']
+                ))
+            if options['tags']:
+                self.report('Теги', *self.load_tags(
+                    options['tags'], options['batch_size']
+                ))
+
+    def report(self, title, rows, created, updated, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{title}: прочитано {rows}, добавлено {created}, '
+            f'обновлено {updated} за {elapsed:.2f} с '
+            f'({rows / elapsed if elapsed else rows:.0f} строк/с)'
+        ))
+
+    def load_ingredients(self, path, batch_size):
+        started = time.perf_counter()
+        seen = set(Ingredient.objects.values_list('name', 'measurement_unit'))
+        rows = created = 0
+        new = []
+        for name, unit in read_ingredients(path):
+            rows += 1
+            key = (name.strip(), unit.strip())
+            if key in seen:
+                continue
+            seen.add(key)
+            new.append(Ingredient(name=key[0], measurement_unit=key[1]))
+        for batch in batches(new, batch_size):
+            created += len(Ingredient.objects.bulk_create(batch))
+        return rows, created, 0, started
+
+    def load_tags(self, path, batch_size):
+        started = time.perf_counter()
+        existing = Tag.objects.in_bulk(field_name='slug')
+        rows = 0
+        new = {}
+        changed = {}
+        for slug, name, color in read_tags(path):
+            rows += 1
+            tag = existing.get(slug)
+            if tag is None:
+                new[slug] = Tag(slug=slug, name=name, color=color)
+            elif (tag.name, tag.color) != (name, color):
+                tag.name, tag.color = name, color
+                tag.updated_at = timezone.now()
+                changed[slug] = tag
+        Tag.objects.bulk_update(
+            changed.values(), ('name', 'color', 'updated_at'),
+            batch_size=batch_size
+        )
+        Tag.objects.bulk_create(new.values(), batch_size=batch_size)
+        return rows, len(new), len(changed), started
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import find_drift, rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет сводные списки покупок с корзинами и пересобирает '
+        'разошедшиеся'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, завершиться с ошибкой при расхождении'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересобрать списки всех пользователей без сверки'
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        user_ids = sorted(
+            set(ShoppingCart.objects.values_list('user_id', flat=True))
+            | set(ShoppingListItem.objects.values_list('user_id', flat=True))
+        )
+        size = options['batch_size']
+        drifted = 0
+        for start in range(0, len(user_ids), size):
+            batch = user_ids[start:start + size]
+            if not options['all']:
+                batch = find_drift(batch)
+            drifted += len(batch)
+            if batch and not options['check']:
+                rebuild(batch)
+        if options['check'] and drifted:
+            raise CommandError(f'Расхождения у пользователей: {drifted}')
+        self.stdout.write(
+            f'Пользователей: {len(user_ids)}, пересобрано: '
+            f'{0 if options["check"] else drifted}'
+        )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from recipes.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счётчики избранного, покупок, рецептов и подписчиков'
+
+    def handle(self, *args, **options):
+        for field, fixed in reconcile_counters().items():
+            self.stdout.write(f'{field}: исправлено {fixed}')
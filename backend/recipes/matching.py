@@ -0,0 +1,115 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from recipes.models import IngredientRecipe, Recipe
+
+
+class RecipeMatchIndex:
+    """Наборы ингредиентов рецептов в памяти процесса.
+
+    Для каждого рецепта хранится отсортированный кортеж id ингредиентов,
+    для каждого ингредиента — множество рецептов. Оценка запроса проходит
+    только по рецептам, где встречается хотя бы один ингредиент
+    пользователя, без GROUP BY по связующей таблице.
+
+    Изменения в своём процессе применяются сразу, а изменения других
+    процессов - по версии рецептов (число и максимальный updated_at),
+    которая сверяется с базой раз в MATCH_INDEX_CHECK_INTERVAL секунд.
+    """
+
+    def __init__(self, version=None):
+        self.recipes = {}
+        self.postings = defaultdict(set)
+        self.version = version
+        self.checked = time.monotonic()
+
+    def add(self, recipe_id, ingredient_ids):
+        self.remove(recipe_id)
+        ingredient_ids = tuple(sorted(set(ingredient_ids)))
+        if not ingredient_ids:
+            return
+        self.recipes[recipe_id] = ingredient_ids
+        for ingredient_id in ingredient_ids:
+            self.postings[ingredient_id].add(recipe_id)
+
+    def remove(self, recipe_id):
+        for ingredient_id in self.recipes.pop(recipe_id, ()):
+            self.postings[ingredient_id].discard(recipe_id)
+            if not self.postings[ingredient_id]:
+                del self.postings[ingredient_id]
+
+    def match(self, ingredient_ids):
+        """Список (id рецепта, найдено, всего): сначала рецепты с меньшим
+        числом недостающих ингредиентов, затем с большим покрытием."""
+        hits = Counter()
+        for ingredient_id in set(ingredient_ids):
+            hits.update(self.postings.get(ingredient_id, ()))
+        ranking = [
+            (recipe_id, matched, len(self.recipes[recipe_id]))
+            for recipe_id, matched in hits.items()
+        ]
+        ranking.sort(key=lambda item: (
+            item[2] - item[1], -item[1] / item[2], -item[0]
+        ))
+        return ranking
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def recipe_version():
+    version = Recipe.objects.aggregate(
+        last_modified=Max('updated_at'), count=Count('id')
+    )
+    return version['count'], version['last_modified']
+
+
+def build_match_index(version):
+    index = RecipeMatchIndex(version)
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id in (
+        IngredientRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator()
+    ):
+        ingredients[recipe_id].append(ingredient_id)
+    for recipe_id, ingredient_ids in ingredients.items():
+        index.add(recipe_id, ingredient_ids)
+    return index
+
+
+def get_match_index():
+    global _index
+    with _lock:
+        if _index is None or (
+            time.monotonic() - _index.checked
+            >= settings.MATCH_INDEX_CHECK_INTERVAL
+        ):
+            version = recipe_version()
+            if _index is not None and _index.version == version:
+                _index.checked = time.monotonic()
+            else:
+                _index = build_match_index(version)
+        return _index
+
+
+def refresh_recipe(recipe_id):
+    if _index is None:
+        return
+    ingredient_ids = list(IngredientRecipe.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('ingredient_id', flat=True))
+    with _lock:
+        if _index is not None:
+            _index.add(recipe_id, ingredient_ids)
+
+
+def remove_recipe(recipe_id):
+    with _lock:
+        if _index is not None:
+            _index.remove(recipe_id)
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='card_image',
+            field=models.ImageField(blank=True, upload_to='recipes/renditions/', verbose_name='Изображение для карточки'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='thumbnail',
+            field=models.ImageField(blank=True, upload_to='recipes/renditions/', verbose_name='Миниатюра'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:27
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+        'USING gin (search_vector);'
+    )
+    schema_editor.execute(
+        """
+        UPDATE recipes_recipe AS recipe SET search_vector =
+            setweight(to_tsvector(%s::regconfig, recipe.name), 'A')
+            || setweight(to_tsvector(%s::regconfig, recipe.text), 'B')
+            || setweight(to_tsvector(%s::regconfig, coalesce((
+                SELECT string_agg(ingredient.name, ' ')
+                FROM recipes_ingredientrecipe AS item
+                JOIN recipes_ingredient AS ingredient
+                    ON ingredient.id = item.ingredient_id
+                WHERE item.recipe_id = recipe.id
+            ), '')), 'C');
+        """,
+        [settings.SEARCH_CONFIG] * 3
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX recipe_search_vector_idx;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_rankings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:39
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='servings',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1, 'Минимальное количество порций = 1')], verbose_name='Количество порций'),
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='servings',
+            field=models.PositiveSmallIntegerField(blank=True, help_text='Пусто - столько порций, сколько в рецепте', null=True, verbose_name='Количество порций'),
+        ),
+    ]
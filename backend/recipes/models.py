@@ -1,6 +1,8 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 from users.models import User
 
 
@@ -19,6 +21,11 @@ class Tag(models.Model):
         verbose_name='Слаг тега',
         unique=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Тег'
@@ -38,6 +45,11 @@ class Ingredient(models.Model):
         verbose_name='Единица измерения',
         max_length=24
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -63,6 +75,16 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/',
     )
+    thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipes/renditions/',
+        blank=True,
+    )
+    card_image = models.ImageField(
+        verbose_name='Изображение для карточки',
+        upload_to='recipes/renditions/',
+        blank=True,
+    )
     text = models.TextField(verbose_name='Описание')
     ingredients = models.ManyToManyField(
         Ingredient,
@@ -76,11 +98,48 @@ class Recipe(models.Model):
             MinValueValidator(1, 'Минимальное время приготовления = 1 мин'),
         )
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        default=1,
+        validators=(
+            MinValueValidator(1, 'Минимальное количество порций = 1'),
+        )
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+        db_index=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+    cart_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-id', )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = (
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-id'],
+                name='recipe_quick_idx'
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}. Автор: {self.author.username}'
@@ -130,6 +189,11 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Пользователь'
     )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now,
+        db_index=True
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -158,6 +222,12 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         verbose_name='Пользователь'
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Количество порций',
+        null=True,
+        blank=True,
+        help_text='Пусто - столько порций, сколько в рецепте'
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -167,6 +237,91 @@ class ShoppingCart(models.Model):
                 fields=['recipe', 'user'],
                 name='unique_user_recipe_in_cart'),
         )
+        indexes = (
+            models.Index(
+                fields=['user', 'recipe'],
+                name='cart_user_recipe_idx'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} / {self.recipe}'
+
+
+class RecipeRanking(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='ranking',
+        verbose_name='Рецепт'
+    )
+    trending_score = models.FloatField(
+        verbose_name='Рейтинг популярности за период',
+        db_index=True
+    )
+    computed_at = models.DateTimeField(verbose_name='Дата расчёта')
+
+    class Meta:
+        verbose_name = 'Рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.trending_score:.2f}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='feed',
+        on_delete=models.CASCADE,
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Рецепт'
+    )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            ),
+        )
 
     def __str__(self):
         return f'{self.user} / {self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        related_name='shopping_list',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        related_name='shopping_list_items',
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    amount = models.FloatField(verbose_name='Количество')
+
+    class Meta:
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Списки покупок (сводные)'
+        constraints = (
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} / {self.ingredient}: {self.amount}'
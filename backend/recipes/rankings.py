@@ -0,0 +1,36 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import Favorite, RecipeRanking
+
+
+def compute_trending(days=7, half_life_hours=48):
+    """Пересчитывает таблицу RecipeRanking.
+
+    Каждое добавление в избранное за последние days дней даёт вклад
+    0.5 ** (возраст / half_life_hours), так что свежие добавления весят
+    больше старых.
+    """
+    now = timezone.now()
+    scores = defaultdict(float)
+    for recipe_id, created in Favorite.objects.filter(
+        created__gte=now - timedelta(days=days)
+    ).values_list('recipe_id', 'created').iterator():
+        age = (now - created).total_seconds() / 3600
+        scores[recipe_id] += 0.5 ** (age / half_life_hours)
+    with transaction.atomic():
+        RecipeRanking.objects.all().delete()
+        RecipeRanking.objects.bulk_create(
+            (
+                RecipeRanking(
+                    recipe_id=recipe_id, trending_score=score,
+                    computed_at=now
+                )
+                for recipe_id, score in scores.items()
+            ),
+            batch_size=1000
+        )
+    return len(scores)
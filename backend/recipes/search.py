@@ -0,0 +1,182 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector
+)
+from django.db import connection
+from django.db.models import (
+    Case, F, IntegerField, OuterRef, Subquery, Value, When
+)
+
+from recipes.models import IngredientRecipe, Recipe
+
+WEIGHTS = {'name': 1.0, 'text': 0.4, 'ingredients': 0.2}
+TOKEN = re.compile(r'\w+')
+
+
+def tokenize(value):
+    return TOKEN.findall(value.lower())
+
+
+def uses_postgres():
+    return connection.vendor == 'postgresql'
+
+
+class RecipeSearchIndex:
+    """Инвертированный индекс в памяти процесса для баз без полнотекстового
+    поиска (SQLite в разработке и тестах).
+
+    Слово запроса совпадает со всеми словами индекса, начинающимися с него,
+    что грубо заменяет морфологию PostgreSQL.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.documents = {}
+        self.tokens = []
+
+    def add(self, recipe_id, name, text, ingredients):
+        self.remove(recipe_id)
+        weights = defaultdict(float)
+        for field, value in (
+            ('name', name), ('text', text), ('ingredients', ingredients)
+        ):
+            for token in tokenize(value):
+                weights[token] += WEIGHTS[field]
+        for token, weight in weights.items():
+            self.postings[token][recipe_id] = weight
+        self.documents[recipe_id] = tuple(weights)
+        self.tokens = None
+
+    def remove(self, recipe_id):
+        for token in self.documents.pop(recipe_id, ()):
+            self.postings[token].pop(recipe_id, None)
+            if not self.postings[token]:
+                del self.postings[token]
+        self.tokens = None
+
+    def matching(self, word):
+        if self.tokens is None:
+            self.tokens = sorted(self.postings)
+        position = bisect_left(self.tokens, word)
+        scores = defaultdict(float)
+        while (
+            position < len(self.tokens)
+            and self.tokens[position].startswith(word)
+        ):
+            for recipe_id, weight in self.postings[
+                self.tokens[position]
+            ].items():
+                scores[recipe_id] = max(scores[recipe_id], weight)
+            position += 1
+        return scores
+
+    def search(self, query, limit):
+        """id рецептов, содержащих все слова запроса, по убыванию веса."""
+        scores = None
+        for word in tokenize(query):
+            matches = self.matching(word)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    recipe_id: score + matches[recipe_id]
+                    for recipe_id, score in scores.items()
+                    if recipe_id in matches
+                }
+        if not scores:
+            return []
+        return sorted(scores, key=lambda pk: (-scores[pk], -pk))[:limit]
+
+
+_index = None
+_lock = threading.Lock()
+
+
+def ingredient_names(recipe_ids):
+    names = defaultdict(list)
+    for recipe_id, name in IngredientRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient__name'):
+        names[recipe_id].append(name)
+    return {recipe_id: ' '.join(items) for recipe_id, items in names.items()}
+
+
+def get_search_index():
+    global _index
+    with _lock:
+        if _index is None:
+            index = RecipeSearchIndex()
+            recipes = list(Recipe.objects.values_list('id', 'name', 'text'))
+            names = ingredient_names([recipe[0] for recipe in recipes])
+            for recipe_id, name, text in recipes:
+                index.add(recipe_id, name, text, names.get(recipe_id, ''))
+            _index = index
+        return _index
+
+
+def update_search_vector(recipe_id):
+    """Обновляет поисковый вектор рецепта одним UPDATE (PostgreSQL) или
+    запись во внутрипроцессном индексе (остальные базы)."""
+    if uses_postgres():
+        config = settings.SEARCH_CONFIG
+        names = Subquery(
+            IngredientRecipe.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                names=StringAgg('ingredient__name', ' ')
+            ).values('names')
+        )
+        Recipe.objects.filter(pk=recipe_id).update(search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector('text', weight='B', config=config)
+            + SearchVector(names, weight='C', config=config)
+        ))
+        return
+    if _index is None:
+        return
+    recipe = Recipe.objects.filter(pk=recipe_id).values_list(
+        'name', 'text'
+    ).first()
+    with _lock:
+        if _index is None:
+            return
+        if recipe is None:
+            _index.remove(recipe_id)
+        else:
+            _index.add(
+                recipe_id, *recipe,
+                ingredient_names([recipe_id]).get(recipe_id, '')
+            )
+
+
+def remove_from_search(recipe_id):
+    with _lock:
+        if _index is not None:
+            _index.remove(recipe_id)
+
+
+def search_recipes(queryset, query):
+    """Фильтрует queryset по запросу и сортирует по релевантности."""
+    if uses_postgres():
+        search_query = SearchQuery(
+            query, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        ).order_by('-rank', '-id')
+    ids = get_search_index().search(query, settings.SEARCH_FALLBACK_LIMIT)
+    if not ids:
+        return queryset.none()
+    return queryset.filter(id__in=ids).order_by(Case(
+        *(
+            When(id=pk, then=Value(position))
+            for position, pk in enumerate(ids)
+        ),
+        output_field=IntegerField()
+    ))
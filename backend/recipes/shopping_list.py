@@ -0,0 +1,106 @@
+"""Материализованный сводный список покупок: (пользователь, ингредиент,
+количество).
+
+Таблица поддерживается дельтами: при добавлении рецепта в корзину его
+вклад прибавляется, при удалении - вычитается, при правке рецепта или
+числа порций старый вклад вычитается, а новый прибавляется. Каждая
+дельта - один INSERT ... SELECT ... ON CONFLICT DO UPDATE. Строки
+корзины, чей вклад вычитается, предварительно блокируются (SELECT ... FOR
+UPDATE), чтобы параллельные удаления и правки не учитывали их дважды.
+"""
+from contextlib import contextmanager
+
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+
+from recipes.models import ShoppingCart, ShoppingListItem
+
+EPSILON = 1e-6
+
+
+def contributions(carts):
+    """Вклад строк корзины по (пользователь, ингредиент) с учётом порций."""
+    return carts.filter(
+        recipe__recipe_ingredient__isnull=False
+    ).values(
+        'user_id', 'recipe__recipe_ingredient__ingredient_id'
+    ).annotate(
+        total=Sum(
+            Cast('recipe__recipe_ingredient__amount', FloatField())
+            * Coalesce('servings', 'recipe__servings')
+            / F('recipe__servings')
+        )
+    ).order_by()
+
+
+def apply_delta(carts, sign=1):
+    """Прибавляет (sign=1) или вычитает (sign=-1) вклад строк корзины."""
+    rows = contributions(carts).annotate(delta=F('total') * Value(sign))
+    try:
+        sql, params = rows.values_list(
+            'user_id', 'recipe__recipe_ingredient__ingredient_id', 'delta'
+        ).query.sql_with_params()
+    except EmptyResultSet:
+        return
+    table = connection.ops.quote_name(ShoppingListItem._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, ingredient_id, amount) {sql} '
+            f'ON CONFLICT (user_id, ingredient_id) '
+            f'DO UPDATE SET amount = {table}.amount + excluded.amount',
+            params
+        )
+    if sign < 0:
+        ShoppingListItem.objects.filter(
+            user_id__in=carts.values('user_id'), amount__lt=EPSILON
+        ).delete()
+
+
+def lock(carts):
+    """Блокирует строки корзины до конца транзакции и возвращает набор,
+    ограниченный заблокированными строками.
+    """
+    return ShoppingCart.objects.filter(id__in=list(
+        carts.select_for_update().values_list('id', flat=True)
+    ))
+
+
+@contextmanager
+def recalculate(carts):
+    """Вычитает вклад строк корзины до их правки и прибавляет после."""
+    with transaction.atomic():
+        carts = lock(carts)
+        apply_delta(carts, -1)
+        yield
+        apply_delta(carts, 1)
+
+
+@transaction.atomic
+def rebuild(user_ids):
+    ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+    apply_delta(ShoppingCart.objects.filter(user_id__in=user_ids))
+
+
+def find_drift(user_ids):
+    """Пользователи, чьи строки в таблице расходятся с корзиной."""
+    expected = {
+        (row['user_id'], row['recipe__recipe_ingredient__ingredient_id']):
+            row['total']
+        for row in contributions(
+            ShoppingCart.objects.filter(user_id__in=user_ids)
+        )
+    }
+    stored = {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in ShoppingListItem.objects.filter(
+            user_id__in=user_ids
+        ).values_list('user_id', 'ingredient_id', 'amount')
+    }
+    drifted = set()
+    for key in expected.keys() | stored.keys():
+        amount = expected.get(key, 0)
+        if abs(amount - stored.get(key, 0)) > EPSILON * max(1, abs(amount)):
+            drifted.add(key[0])
+    return drifted
@@ -0,0 +1,77 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.counters import COUNTER_FIELDS, change_recipe_counter
+from recipes.feed import backfill, fan_out, remove_author
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.matching import refresh_recipe, remove_recipe
+from recipes.search import remove_from_search, update_search_vector
+from recipes.shopping_list import apply_delta, rebuild
+from users.models import Follow, UserCounters
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_added(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(instance.recipe_id, COUNTER_FIELDS[sender], 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+def recipe_removed(sender, instance, **kwargs):
+    change_recipe_counter(instance.recipe_id, COUNTER_FIELDS[sender], -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_delta(ShoppingCart.objects.filter(pk=instance.pk))
+    else:
+        rebuild((instance.user_id,))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def cart_deleting(sender, instance, **kwargs):
+    apply_delta(ShoppingCart.objects.filter(pk=instance.pk), -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, raw=False, **kwargs):
+    if created:
+        UserCounters.increment(instance.author_id, 'recipes_count')
+    if raw:
+        return
+    transaction.on_commit(lambda: recipe_changed(instance.pk))
+    if created:
+        transaction.on_commit(
+            lambda: fan_out(instance.pk, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    UserCounters.increment(instance.author_id, 'recipes_count', -1)
+    remove_from_search(instance.pk)
+    remove_recipe(instance.pk)
+
+
+def recipe_changed(recipe_id):
+    update_search_vector(recipe_id)
+    refresh_recipe(recipe_id)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(
+            lambda: backfill(instance.user_id, instance.author_id)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    remove_author(instance.user_id, instance.author_id)
@@ -0,0 +1,57 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def count_by(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(count=Count('pk')).values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model('auth', 'User')
+    UserCounters = apps.get_model('users', 'UserCounters')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Follow = apps.get_model('users', 'Follow')
+    UserCounters.objects.bulk_create(
+        UserCounters(
+            user_id=user['pk'],
+            recipes_count=user['recipes_count'],
+            followers_count=user['followers_count'],
+        )
+        for user in User.objects.annotate(
+            recipes_count=count_by(Recipe, 'author'),
+            followers_count=count_by(Follow, 'author'),
+        ).values('pk', 'recipes_count', 'followers_count').iterator()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('recipes', '0001_initial'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to='auth.user', verbose_name='Пользователь')),
+                ('recipes_count', models.PositiveIntegerField(default=0, verbose_name='Рецептов')),
+                ('followers_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
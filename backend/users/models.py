@@ -29,3 +29,39 @@ class Follow(models.Model):
                 fields=('user', 'author',),
                 name='unique_follow'),
         )
+
+
+class UserCounters(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        verbose_name='Пользователь',
+        related_name='counters'
+    )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return f'{self.user}'
+
+    @classmethod
+    def increment(cls, user_id, field, delta=1):
+        """Атомарно изменяет счётчик, создавая строку при необходимости."""
+        counters = cls.objects.filter(user_id=user_id)
+        values = {field: models.F(field) + delta}
+        if delta < 0:
+            counters.filter(**{f'{field}__gte': -delta}).update(**values)
+        elif not counters.update(**values):
+            cls.objects.get_or_create(user_id=user_id)
+            counters.update(**values)